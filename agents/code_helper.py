@@ -1,6 +1,9 @@
-from langchain.agents import AgentExecutor, create_openai_tools_agent
+from functools import lru_cache
+
+from langchain.agents import create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from agents.parallel_executor import ParallelAgentExecutor
 from core.llm_service import get_llm
 from tools.code_helper_tools import run_code_tool, analyze_file_tool, analyze_folder_tool, write_improved_code_tool
 
@@ -30,9 +33,12 @@ IMPORTANT INSTRUCTIONS:
 Use your tools if needed, but respond clearly and precisely.
 '''
 
-def get_code_helper():
-    llm = get_llm()
-    tools = [run_code_tool, analyze_folder_tool, analyze_file_tool, write_improved_code_tool]
+@lru_cache(maxsize=2)
+def get_code_helper(allow_host_tools: bool = True):
+    """Builds the CodeHelper agent. Without `allow_host_tools` it can neither run code nor read files on this machine."""
+    llm = get_llm(agent_name="codehelper")
+    host_tools = [run_code_tool, analyze_folder_tool, analyze_file_tool] if allow_host_tools else []
+    tools = host_tools + [write_improved_code_tool]
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", CODING_AGENT_SYSTEM_PROMPT),
@@ -42,11 +48,11 @@ def get_code_helper():
 
     agent = create_openai_tools_agent(llm, tools, prompt)
     
-    return AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True, max_iterations=3)
+    return ParallelAgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True, max_iterations=3)
 
-def run_code_helper(query: str):
+def run_code_helper(query: str, allow_host_tools: bool = True):
     try:
-        agent_executor = get_code_helper()
+        agent_executor = get_code_helper(allow_host_tools)
         response = agent_executor.invoke({"input": query})
         return response.get("output", "No output from CodeHelper.")
     except Exception as e:
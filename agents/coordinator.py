@@ -1,13 +1,56 @@
-def route_query(query: str, agent_name: str):
-    """Routes a query to the specified agent."""
+from functools import partial
+
+AGENT_NAMES = ("studybuddy", "codehelper", "scholarscout")
+
+def route_query(query: str, agent_name: str, allow_host_tools: bool = True):
+    """Routes a query to the specified agent.
+
+    `allow_host_tools=False` withholds the tools that run code, read files, download papers or index
+    directories on this machine, for queries that come from other machines.
+    """
     if agent_name == "studybuddy":
         from .study_buddy_rag import run_study_buddy
-        return run_study_buddy(query)
+        return run_study_buddy(query, allow_host_tools)
     elif agent_name == "codehelper":
         from .code_helper import run_code_helper
-        return run_code_helper(query)
+        return run_code_helper(query, allow_host_tools)
     elif agent_name == "scholarscout":
         from .scholar_scout import run_scholar_scout
-        return run_scholar_scout(query)
+        return run_scholar_scout(query, allow_host_tools)
     else:
-        return f"Error: Unknown agent '{agent_name}'. Cannot route query."
\ No newline at end of file
+        return f"Error: Unknown agent '{agent_name}'. Cannot route query."
+
+def stream_query(query: str, agent_name: str, allow_host_tools: bool = True):
+    """Routes a query to the specified agent and yields its progress as event dicts, ending with an 'output' or 'error' event."""
+    if agent_name == "studybuddy":
+        from .study_buddy_rag import stream_study_buddy
+        yield from stream_study_buddy(query, allow_host_tools)
+    elif agent_name == "codehelper":
+        from .code_helper import get_code_helper
+        yield from _stream_agent_executor(partial(get_code_helper, allow_host_tools), query, "CodeHelper")
+    elif agent_name == "scholarscout":
+        from .scholar_scout import get_scholar_scout
+        yield from _stream_agent_executor(partial(get_scholar_scout, allow_host_tools), query, "ScholarScout")
+    else:
+        yield {"event": "error", "message": f"Error: Unknown agent '{agent_name}'. Cannot route query."}
+
+def warm_up_agents(allow_host_tools: bool = True):
+    """Builds every agent once so that the first routed queries don't pay the setup cost."""
+    from .study_buddy_rag import get_study_buddy_chain
+    from .code_helper import get_code_helper
+    from .scholar_scout import get_scholar_scout
+    get_study_buddy_chain()
+    get_code_helper(allow_host_tools)
+    get_scholar_scout(allow_host_tools)
+
+def _stream_agent_executor(get_agent_executor, query: str, display_name: str):
+    try:
+        for chunk in get_agent_executor().stream({"input": query}):
+            for action in chunk.get("actions", []):
+                yield {"event": "tool_call", "tool": action.tool, "input": action.tool_input}
+            for step in chunk.get("steps", []):
+                yield {"event": "tool_result", "tool": step.action.tool, "output": str(step.observation)}
+            if "output" in chunk:
+                yield {"event": "output", "content": chunk["output"]}
+    except Exception as e:
+        yield {"event": "error", "message": f"Error running {display_name}: {e}"}
@@ -0,0 +1,90 @@
+from typing import Iterator, Optional, Union
+
+from langchain.agents import AgentExecutor
+from langchain.agents.agent import ExceptionTool
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.tools import BaseTool
+
+from core.config import MAX_PARALLEL_TOOL_CALLS
+
+class ParallelAgentExecutor(AgentExecutor):
+    """AgentExecutor that runs the tool calls the LLM emits in one step concurrently.
+
+    At most `max_parallel_tool_calls` tools run at once, and their results are returned in call order,
+    so a step takes as long as its slowest tool call rather than the sum of all of them.
+    """
+    max_parallel_tool_calls: int = MAX_PARALLEL_TOOL_CALLS
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map: dict[str, BaseTool],
+        color_mapping: dict[str, str],
+        inputs: dict[str, str],
+        intermediate_steps: list[tuple[AgentAction, str]],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Iterator[Union[AgentFinish, AgentAction, AgentStep]]:
+        # Mirrors AgentExecutor._iter_next_step as of langchain 0.3.25; only the tool dispatch at the end differs.
+        # Re-check this method (and _parsing_error_step) against upstream when upgrading langchain.
+        try:
+            output = self._action_agent.plan(
+                self._prepare_intermediate_steps(intermediate_steps),
+                callbacks=run_manager.get_child() if run_manager else None,
+                **inputs,
+            )
+        except OutputParserException as e:
+            yield self._parsing_error_step(e, run_manager)
+            return
+
+        if isinstance(output, AgentFinish):
+            yield output
+            return
+
+        actions = [output] if isinstance(output, AgentAction) else output
+        yield from actions
+
+        if len(actions) == 1 or self.max_parallel_tool_calls <= 1:
+            for action in actions:
+                yield self._perform_agent_action(name_to_tool_map, color_mapping, action, run_manager)
+            return
+
+        # ContextThreadPoolExecutor copies contextvars, so tracing and callback context reach the tools.
+        with ContextThreadPoolExecutor(max_workers=min(self.max_parallel_tool_calls, len(actions))) as pool:
+            yield from pool.map(
+                lambda action: self._perform_agent_action(name_to_tool_map, color_mapping, action, run_manager),
+                actions,
+            )
+
+    def _parsing_error_step(self, error: OutputParserException, run_manager: Optional[CallbackManagerForChainRun]) -> AgentStep:
+        # Copied from the OutputParserException branch of AgentExecutor._iter_next_step (langchain 0.3.25):
+        # the parsing error is fed back to the LLM as an observation.
+        if self.handle_parsing_errors is False:
+            raise ValueError(
+                "An output parsing error occurred. Pass `handle_parsing_errors=True` to the AgentExecutor "
+                f"to send it back to the agent and let it try again. This is the error: {error}"
+            )
+        text = str(error)
+        if isinstance(self.handle_parsing_errors, bool):
+            if error.send_to_llm:
+                observation = str(error.observation)
+                text = str(error.llm_output)
+            else:
+                observation = "Invalid or incomplete response"
+        elif isinstance(self.handle_parsing_errors, str):
+            observation = self.handle_parsing_errors
+        else:
+            observation = self.handle_parsing_errors(error)
+
+        action = AgentAction("_Exception", observation, text)
+        if run_manager:
+            run_manager.on_agent_action(action, color="green")
+        observation = ExceptionTool().run(
+            action.tool_input,
+            verbose=self.verbose,
+            color=None,
+            callbacks=run_manager.get_child() if run_manager else None,
+            **self._action_agent.tool_run_logging_kwargs(),
+        )
+        return AgentStep(action=action, observation=observation)
@@ -1,6 +1,9 @@
-from langchain.agents import AgentExecutor, create_openai_tools_agent
+from functools import lru_cache
+
+from langchain.agents import create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from agents.parallel_executor import ParallelAgentExecutor
 from core.llm_service import get_llm
 from tools.scholar_scout_tools import semantic_scholar_tool, get_paper_details_tool, download_paper_tool
 
@@ -25,9 +28,11 @@ If the user explicitly asks to download a paper, use the download_paper_tool too
 if you are given a link of a paper like this 'https://www.semanticscholar.org/paper/Scaling-LLM-Test-Time-Compute-Optimally-can-be-More-Snell-Lee/8292083dd8f6ae898ea0ee54a6b97997d1a51c9d' the id is the last part of the url, for this example: 8292083dd8f6ae898ea0ee54a6b97997d1a51c9d.
 '''
 
-def get_scholar_scout():
-    llm = get_llm()
-    tools = [semantic_scholar_tool, get_paper_details_tool, download_paper_tool]
+@lru_cache(maxsize=2)
+def get_scholar_scout(allow_host_tools: bool = True):
+    """Builds the ScholarScout agent. Without `allow_host_tools` it cannot download papers to this machine."""
+    llm = get_llm(agent_name="scholarscout")
+    tools = [semantic_scholar_tool, get_paper_details_tool] + ([download_paper_tool] if allow_host_tools else [])
     
     prompt = ChatPromptTemplate.from_messages([
         ("system", SCHOLAR_AGENT_SYSTEM_PROMPT),
@@ -37,11 +42,11 @@ def get_scholar_scout():
 
     agent = create_openai_tools_agent(llm, tools, prompt)
     
-    return AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True, max_iterations=6)
+    return ParallelAgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True, max_iterations=6)
 
-def run_scholar_scout(query: str):
+def run_scholar_scout(query: str, allow_host_tools: bool = True):
     try:
-        agent_executor = get_scholar_scout()
+        agent_executor = get_scholar_scout(allow_host_tools)
         response = agent_executor.invoke({"input": query})
         return response.get("output", "No output from ScholarScout.")
     except Exception as e:
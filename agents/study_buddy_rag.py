@@ -1,5 +1,8 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -52,37 +55,119 @@ Final Polished Response:
 """
 
 def get_route_chain():
-    llm = get_llm()
+    llm = get_llm(agent_name="studybuddy")
     prompt = ChatPromptTemplate.from_template(ROUTE_PROMPT_TEMPLATE)
     return prompt | llm.with_structured_output(ToolChoice)
 
 rag_manager = RAGManager()
 
-def execute_tool(tool_choice: ToolChoice) -> dict:
+# Retrieval on the raw query starts while the router is still deciding, since it almost always picks
+# query_knowledge_base. The counters show how often that speculation pays off.
+_speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-retrieval")
+_speculation_lock = threading.Lock()
+speculation_stats = {"launched": 0, "used": 0, "discarded": 0, "failed": 0}
+
+def _count_speculation(outcome: str):
+    with _speculation_lock:
+        speculation_stats[outcome] += 1
+
+def get_speculation_stats() -> dict:
+    with _speculation_lock:
+        return dict(speculation_stats)
+
+class SpeculativeRetrieval:
+    """Vector search on the raw query, started before the router has decided whether it is needed.
+
+    Every speculation ends up counted exactly once: as used, failed or discarded.
+    """
+    def __init__(self, query: str):
+        self.query = query
+        self.settled = False
+        _count_speculation("launched")
+        self.future: Future = _speculation_executor.submit(rag_manager.retrieve, query)
+
+    def use(self) -> Optional[list]:
+        """Returns the prefetched documents, or None if the search failed and must be run again."""
+        self.settled = True
+        try:
+            documents = self.future.result()
+        except Exception as e:
+            print(f"Speculative retrieval failed, retrieving again: {e}")
+            _count_speculation("failed")
+            return None
+        _count_speculation("used")
+        return documents
+
+    def discard(self, wait: bool = False):
+        if self.settled:
+            return
+        self.settled = True
+        _count_speculation("discarded")
+        if not self.future.cancel() and wait:
+            # Let a running search finish so it cannot race with re-indexing the vector store.
+            self.future.exception()
+
+def execute_tool(tool_choice: ToolChoice, speculation: Optional[SpeculativeRetrieval] = None, allow_host_tools: bool = True) -> dict:
+    if tool_choice.tool_name == "query_knowledge_base":
+        documents = None
+        if speculation and tool_choice.tool_input.strip() == speculation.query.strip():
+            documents = speculation.use()
+        elif speculation:
+            # The router rewrote the question, so the prefetched context belongs to a different query.
+            speculation.discard()
+        return {"tool_output": rag_manager.query(tool_choice.tool_input, documents=documents)}
+
+    if speculation:
+        speculation.discard(wait=True)
     if tool_choice.tool_name == "index_document_directory":
+        if not allow_host_tools:
+            return {"tool_output": "Error: Indexing directories is disabled here. Index them from the command line instead."}
         path_str = tool_choice.tool_input.strip().replace("'", "").replace('"', '')
         force_re = "force recreate is set to true" in tool_choice.tool_input.lower()
         return {"tool_output": rag_manager.build_or_update_index(Path(path_str), force_recreate=force_re)}
-    elif tool_choice.tool_name == "query_knowledge_base":
-        return {"tool_output": rag_manager.query(tool_choice.tool_input)}
     else:
         return {"tool_output": "Error: Invalid tool chosen by router."}
 
 def get_final_answer_chain():
-    llm = get_llm()
+    llm = get_llm(agent_name="studybuddy")
     prompt = ChatPromptTemplate.from_template(FINAL_ANSWER_PROMPT_TEMPLATE)
     return prompt | llm | StrOutputParser()
 
-def run_study_buddy(query: str):
+@lru_cache(maxsize=1)
+def get_study_buddy_chain():
+    route_chain = get_route_chain()
+    final_answer_chain = get_final_answer_chain()
+
+    return (
+        {"chosen_tool": route_chain, "original_query": RunnablePassthrough()}
+        | RunnableLambda(lambda x: {
+            "tool_output": execute_tool(
+                x["chosen_tool"], x["original_query"].get("speculation"), x["original_query"].get("allow_host_tools", True)
+            )["tool_output"],
+            "original_query": x["original_query"]["query"],
+        })
+        | final_answer_chain
+    )
+
+def run_study_buddy(query: str, allow_host_tools: bool = True):
+    speculation = SpeculativeRetrieval(query)
     try:
-        route_chain = get_route_chain()
-        final_answer_chain = get_final_answer_chain()
-
-        full_chain = (
-            {"chosen_tool": route_chain, "original_query": RunnablePassthrough()}
-            | RunnableLambda(lambda x: {"tool_output": execute_tool(x["chosen_tool"])["tool_output"], "original_query": x["original_query"]["query"]})
-            | final_answer_chain
-        )
-        return full_chain.invoke({"query": query})
+        return get_study_buddy_chain().invoke({"query": query, "speculation": speculation, "allow_host_tools": allow_host_tools})
     except Exception as e:
         return f"An error occurred in the StudyBuddy chain: {e}"
+    finally:
+        speculation.discard()
+
+def stream_study_buddy(query: str, allow_host_tools: bool = True):
+    """Yields the polished answer token by token as it is generated."""
+    speculation = SpeculativeRetrieval(query)
+    try:
+        answer = ""
+        for token in get_study_buddy_chain().stream({"query": query, "speculation": speculation, "allow_host_tools": allow_host_tools}):
+            answer += token
+            yield {"event": "token", "content": token}
+        yield {"event": "output", "content": answer}
+    except Exception as e:
+        yield {"event": "error", "message": f"An error occurred in the StudyBuddy chain: {e}"}
+    finally:
+        speculation.discard()
@@ -5,7 +5,7 @@ from pathlib import Path
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
+OPENROUTER_API_BASE = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
 
 if not OPENROUTER_API_KEY:
     print("Warning: OPENROUTER_API_KEY not found in .env file. LLM calls will fail.")
@@ -14,9 +14,41 @@ DEFAULT_LLM_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
 
 RAG_LLM_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
 
+# Models tried after the requested one, in order, when it is slow (hedging) or failing.
+FALLBACK_LLM_MODELS = [name.strip() for name in os.getenv(
+    "FALLBACK_LLM_MODELS", "deepseek/deepseek-chat-v3-0324:free,mistralai/mistral-small-3.1-24b-instruct:free"
+).split(",") if name.strip()]
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))  # upper bound in seconds for one LLM call, hedges included
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))  # latency percentile after which the next model is called too
+LLM_HEDGE_DEFAULT_DELAY = 10.0  # seconds, used until a model has enough latency samples
+LLM_HEDGE_MIN_DELAY = 1.0
+LLM_CIRCUIT_FAILURE_THRESHOLD = 3  # consecutive failures that open a model's circuit
+LLM_CIRCUIT_RESET_SECONDS = 30.0
+
 EMBEDDING_MODEL = "mxbai-embed-large"
 
 CHROMA_PERSIST_DIR = Path("rag_db")
 DEFAULT_DOCS_DIR = Path("test_docs")
+DEFAULT_SNAPSHOT_PATH = Path("kb_snapshot.zip")
 
 DOWNLOADS_PATH = Path("fetched_materials")
+
+# Tool calls from a single agent step that CodeHelper and ScholarScout may run at the same time.
+MAX_PARALLEL_TOOL_CALLS = int(os.getenv("MAX_PARALLEL_TOOL_CALLS", "4"))
+
+# Opt-in persistent cache of LLM responses, shared by every agent listed in LLM_CACHE_AGENTS.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_AGENTS = {name.strip() for name in os.getenv("LLM_CACHE_AGENTS", "studybuddy,codehelper,scholarscout").split(",") if name.strip()}
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "llm_cache/responses.sqlite3"))
+LLM_CACHE_MAX_SIZE_MB = float(os.getenv("LLM_CACHE_MAX_SIZE_MB", "100"))
+
+
+# HTTP server (server.py): concurrent runs per agent and how many more requests may wait for a worker.
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_AGENT_WORKERS = os.getenv("SERVER_AGENT_WORKERS", "studybuddy=2,codehelper=2,scholarscout=2")  # parsed by server.py
+SERVER_QUEUE_SIZE = int(os.getenv("SERVER_QUEUE_SIZE", "8"))
+# Bearer token clients must send; without one the server only binds to loopback interfaces.
+SERVER_API_TOKEN = os.getenv("SERVER_API_TOKEN") or None
+# Served agents can run code, read files, download papers and index directories on this machine only if set.
+SERVER_ALLOW_HOST_TOOLS = os.getenv("SERVER_ALLOW_HOST_TOOLS", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,380 @@
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Iterator, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.globals import get_llm_cache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_chunk_to_message
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.outputs.chat_generation import merge_chat_generation_chunks
+from langchain_openai import ChatOpenAI
+
+from .config import (
+    LLM_CIRCUIT_FAILURE_THRESHOLD, LLM_CIRCUIT_RESET_SECONDS, LLM_HEDGE_DEFAULT_DELAY,
+    LLM_HEDGE_MIN_DELAY, LLM_HEDGE_PERCENTILE, LLM_REQUEST_TIMEOUT,
+)
+
+# Below this many samples a model's latency percentile is too noisy to hedge on.
+MIN_LATENCY_SAMPLES = 10
+
+def _run_in_thread(fn, *args, **kwargs) -> Future:
+    """Runs `fn` on a thread of its own and returns its future.
+
+    Not a shared pool: calls abandoned at their deadline or lost to a hedge keep running until their
+    own timeout, and during an outage they would otherwise fill the pool and queue up new calls.
+    """
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+    return future
+
+class ModelHealth:
+    """Latency samples and circuit breaker state of one model, shared by every client that calls it."""
+    def __init__(self, model_name: str, window: int = 200):
+        self.model_name = model_name
+        self.latencies: deque[float] = deque(maxlen=window)
+        # Streamed calls hedge on the wait for their first chunk, which is far shorter than a full completion.
+        self.first_chunk_latencies: deque[float] = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Closed circuits always allow calls; an open one lets a single trial call through per reset period."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= LLM_CIRCUIT_RESET_SECONDS:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_first_chunk(self, latency: float):
+        with self._lock:
+            self.first_chunk_latencies.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= LLM_CIRCUIT_FAILURE_THRESHOLD:
+                self.opened_at = time.monotonic()
+
+    def latency_percentile(self, percentile: float, first_chunk: bool = False) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.first_chunk_latencies if first_chunk else self.latencies)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[max(0, math.ceil(percentile * len(samples)) - 1)]
+
+    def hedge_delay(self, first_chunk: bool = False) -> float:
+        """Seconds to wait for this model (or its first streamed chunk) before sending a hedged request to the next one."""
+        observed = self.latency_percentile(LLM_HEDGE_PERCENTILE, first_chunk)
+        return max(LLM_HEDGE_MIN_DELAY, observed if observed is not None else LLM_HEDGE_DEFAULT_DELAY)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "successes": self.successes,
+            "failures": self.failures,
+            "circuit_open": self.opened_at is not None,
+            "p50_latency": self.latency_percentile(0.5),
+            "p95_latency": self.latency_percentile(0.95),
+            "p99_latency": self.latency_percentile(0.99),
+            "p95_first_chunk_latency": self.latency_percentile(0.95, first_chunk=True),
+        }
+
+_model_health: dict[str, ModelHealth] = {}
+_model_health_lock = threading.Lock()
+
+def get_model_health(model_name: str) -> ModelHealth:
+    with _model_health_lock:
+        if model_name not in _model_health:
+            _model_health[model_name] = ModelHealth(model_name)
+        return _model_health[model_name]
+
+def get_model_health_stats() -> list[dict]:
+    """Returns latency and circuit breaker stats of every model called so far."""
+    with _model_health_lock:
+        healths = list(_model_health.values())
+    return [health.stats() for health in healths]
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model that spreads each call over an ordered list of OpenRouter models.
+
+    The first model gets the request. If it has not answered within its hedge delay (a latency
+    percentile of its recent calls) or fails, the next model is called as well and the first
+    response wins. Models whose circuit breaker is open are skipped, and the whole call is bounded
+    by `request_timeout`.
+    """
+    clients: list[ChatOpenAI]
+    request_timeout: float = LLM_REQUEST_TIMEOUT
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-openrouter"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {
+            "models": [client.model_name for client in self.clients],
+            "temperature": self.clients[0].temperature,
+        }
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the first client format the tools the OpenAI way, then bind the result to this model.
+        return self.bind(**self.clients[0].bind_tools(tools, **kwargs).kwargs)
+
+    @staticmethod
+    def _call_client(client: ChatOpenAI, messages: list[BaseMessage], stop: Optional[list[str]], **kwargs: Any) -> ChatResult:
+        health = get_model_health(client.model_name)
+        start = time.monotonic()
+        try:
+            result = client._generate(messages, stop=stop, **kwargs)
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.monotonic() - start)
+        return result
+
+    def _available_clients(self) -> Iterator[ChatOpenAI]:
+        yielded = False
+        for client in self.clients:
+            if get_model_health(client.model_name).allow_request():
+                yielded = True
+                yield client
+        if not yielded:
+            # Every circuit is open: trying the primary beats failing without a single attempt.
+            yield self.clients[0]
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        deadline = time.monotonic() + self.request_timeout
+        candidates = self._available_clients()
+        pending: dict[Future, ChatOpenAI] = {}
+        errors: list[str] = []
+        last_launched: Optional[ChatOpenAI] = None
+        exhausted = False
+
+        def launch_next() -> bool:
+            nonlocal last_launched, exhausted
+            client = next(candidates, None)
+            if client is None:
+                exhausted = True
+                return False
+            # No call outlives the deadline of the request that made it.
+            timeout = deadline - time.monotonic()
+            pending[_run_in_thread(self._call_client, client, messages, stop, timeout=timeout, **kwargs)] = client
+            last_launched = client
+            return True
+
+        launch_next()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = remaining if exhausted else min(remaining, get_model_health(last_launched.model_name).hedge_delay())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                slow_model = last_launched.model_name
+                if not exhausted and launch_next():
+                    print(f"Model '{slow_model}' is slow, hedging with '{last_launched.model_name}'.")
+                continue
+
+            for future in done:
+                client = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{client.model_name}: {e}")
+                    if not exhausted:
+                        launch_next()
+
+        if pending:
+            raise TimeoutError(f"No model answered within {self.request_timeout:g}s. Errors: {errors or 'none'}")
+        raise RuntimeError(f"All models failed. Errors: {'; '.join(errors)}")
+
+    def _pump_stream(
+        self,
+        client: ChatOpenAI,
+        events: queue.Queue,
+        stop_event: threading.Event,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]],
+        **kwargs: Any,
+    ):
+        """Forwards one client's stream into `events` as (client, kind, payload) until it ends or is stopped."""
+        health = get_model_health(client.model_name)
+        start = time.monotonic()
+        stream = client._stream(messages, stop=stop, **kwargs)
+        first_chunk = True
+        try:
+            for chunk in stream:
+                if stop_event.is_set():
+                    return
+                if first_chunk:
+                    health.record_first_chunk(time.monotonic() - start)
+                    first_chunk = False
+                events.put((client, "chunk", chunk))
+        except Exception as e:
+            health.record_failure()
+            events.put((client, "error", e))
+            return
+        finally:
+            stream.close()
+        health.record_success(time.monotonic() - start)
+        events.put((client, "end", None))
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # BaseChatModel.stream() never consults the cache, so streamed calls do it here with the same
+        # keys as _generate_with_cache: a hit is replayed as one chunk, a completed stream is stored.
+        llm_cache = self.cache if isinstance(self.cache, BaseCache) else get_llm_cache() if self.cache is None else None
+        if not llm_cache:
+            yield from self._hedged_stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+
+        llm_string = self._get_llm_string(stop=stop, **kwargs)
+        prompt = dumps(messages)
+        cached = llm_cache.lookup(prompt, llm_string)
+        if isinstance(cached, list) and cached:
+            chunk = self._replay_chunk(cached[0])
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+
+        chunks: list[ChatGenerationChunk] = []
+        for chunk in self._hedged_stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        generation = merge_chat_generation_chunks(chunks)
+        if generation is not None:
+            llm_cache.update(prompt, llm_string, [
+                ChatGeneration(message=message_chunk_to_message(generation.message), generation_info=generation.generation_info)
+            ])
+
+    @staticmethod
+    def _replay_chunk(generation: ChatGeneration) -> ChatGenerationChunk:
+        message = generation.message
+        return ChatGenerationChunk(
+            message=AIMessageChunk(
+                content=message.content,
+                additional_kwargs=message.additional_kwargs,
+                response_metadata=message.response_metadata,
+                usage_metadata=getattr(message, "usage_metadata", None),
+                tool_call_chunks=[
+                    tool_call_chunk(name=call["name"], args=json.dumps(call["args"]), id=call["id"], index=index)
+                    for index, call in enumerate(getattr(message, "tool_calls", []))
+                ],
+            ),
+            generation_info=generation.generation_info,
+        )
+
+    def _hedged_stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # Hedged like _generate up to the first chunk: the first model to produce one wins and the
+        # others are stopped. A failure after that point can no longer fall back to another model.
+        deadline = time.monotonic() + self.request_timeout
+        candidates = self._available_clients()
+        events: queue.Queue = queue.Queue()
+        launched: list[tuple[ChatOpenAI, threading.Event]] = []
+        running: list[ChatOpenAI] = []
+        errors: list[str] = []
+        winner: Optional[ChatOpenAI] = None
+        exhausted = False
+
+        def launch_next() -> bool:
+            nonlocal exhausted
+            client = next(candidates, None)
+            if client is None:
+                exhausted = True
+                return False
+            stop_event = threading.Event()
+            launched.append((client, stop_event))
+            running.append(client)
+            timeout = deadline - time.monotonic()
+            _run_in_thread(self._pump_stream, client, events, stop_event, messages, stop, timeout=timeout, **kwargs)
+            return True
+
+        launch_next()
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No model finished streaming within {self.request_timeout:g}s. Errors: {errors or 'none'}")
+                hedging = winner is None and not exhausted
+                last_model = launched[-1][0].model_name
+                timeout = min(remaining, get_model_health(last_model).hedge_delay(first_chunk=True)) if hedging else remaining
+                try:
+                    client, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    if hedging and launch_next():
+                        print(f"Model '{last_model}' is slow, hedging with '{launched[-1][0].model_name}'.")
+                    continue
+
+                if winner is not None and client is not winner:
+                    continue
+                if kind == "error":
+                    if winner is not None:
+                        raise payload
+                    errors.append(f"{client.model_name}: {payload}")
+                    running.remove(client)
+                    if not exhausted:
+                        launch_next()
+                    if not running:
+                        raise RuntimeError(f"All models failed. Errors: {'; '.join(errors)}")
+                    continue
+                if winner is None:
+                    winner = client
+                    for other, stop_event in launched:
+                        if other is not winner:
+                            stop_event.set()
+                if kind == "end":
+                    return
+                if run_manager:
+                    run_manager.on_llm_new_token(payload.text, chunk=payload)
+                yield payload
+        finally:
+            for _, stop_event in launched:
+                stop_event.set()
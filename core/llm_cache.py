@@ -0,0 +1,129 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+# loads() is marked beta and would otherwise warn on every cache hit.
+warnings.filterwarnings("ignore", message="The function `loads` is in beta", category=LangChainBetaWarning)
+
+# Fields of a serialized message that change between otherwise identical calls.
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+def normalize_prompt(prompt: str) -> str:
+    """Returns a canonical form of a serialized chat prompt, so that equal conversations share one cache key."""
+    try:
+        messages = json.loads(prompt)
+    except json.JSONDecodeError:
+        return prompt.strip()
+
+    if isinstance(messages, list):
+        for message in messages:
+            kwargs = message.get("kwargs", {}) if isinstance(message, dict) else {}
+            for field in VOLATILE_MESSAGE_FIELDS:
+                kwargs.pop(field, None)
+            if isinstance(kwargs.get("content"), str):
+                kwargs["content"] = kwargs["content"].strip()
+    return json.dumps(messages, sort_keys=True, separators=(",", ":"))
+
+class SQLiteLLMCache(BaseCache):
+    """Persistent exact-match LLM response cache with size-based (least recently used) eviction.
+
+    Several instances may share one database file; hit/miss counters are kept per instance,
+    which lets every agent report its own metrics while reusing each other's responses.
+    """
+    def __init__(self, database_path: Path, max_size_bytes: int, namespace: str = "default"):
+        self.database_path = database_path
+        self.max_size_bytes = max_size_bytes
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.database_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._make_key(prompt, llm_string)
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            try:
+                return_val = loads(row[0])
+            except Exception as e:
+                print(f"Warning: discarding unreadable LLM cache entry: {e}")
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return return_val
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._make_key(prompt, llm_string)
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+            if total_size <= self.max_size_bytes:
+                break
+            stale_keys.append((key,))
+            total_size -= size
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale_keys)
+
+    def clear(self, **kwargs) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this instance and the size of the shared database."""
+        with self._lock, self._connect() as conn:
+            entries, size_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size_bytes,
+        }
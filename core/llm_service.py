@@ -1,18 +1,53 @@
+from typing import Optional
+
 from langchain_openai import ChatOpenAI
 from langchain_ollama import OllamaEmbeddings
-from .config import OPENROUTER_API_KEY,OPENROUTER_API_BASE, DEFAULT_LLM_MODEL, EMBEDDING_MODEL
+from .config import (
+    OPENROUTER_API_KEY, OPENROUTER_API_BASE, DEFAULT_LLM_MODEL, EMBEDDING_MODEL, FALLBACK_LLM_MODELS, LLM_REQUEST_TIMEOUT,
+    LLM_CACHE_ENABLED, LLM_CACHE_AGENTS, LLM_CACHE_PATH, LLM_CACHE_MAX_SIZE_MB,
+)
+from .hedged_llm import HedgedChatModel
+from .llm_cache import SQLiteLLMCache
+
+_llm_caches: dict[str, SQLiteLLMCache] = {}
+
+def get_llm_cache(agent_name: Optional[str] = None) -> Optional[SQLiteLLMCache]:
+    """Returns the response cache for an agent, or None if caching is disabled for it."""
+    if not LLM_CACHE_ENABLED or (agent_name is not None and agent_name not in LLM_CACHE_AGENTS):
+        return None
+    namespace = agent_name or "default"
+    if namespace not in _llm_caches:
+        _llm_caches[namespace] = SQLiteLLMCache(LLM_CACHE_PATH, int(LLM_CACHE_MAX_SIZE_MB * 1024 * 1024), namespace=namespace)
+    return _llm_caches[namespace]
+
+def get_llm_cache_stats() -> list[dict]:
+    """Returns hit/miss metrics of every response cache created so far."""
+    return [cache.stats() for cache in _llm_caches.values()]
 
-def get_llm(model_name: str = DEFAULT_LLM_MODEL, temperature: float = 0.1):
-    """Initializes and returns a LangChain LLM client configured for OpenRouter."""
+def get_llm(model_name: str = DEFAULT_LLM_MODEL, temperature: float = 0.1, agent_name: Optional[str] = None):
+    """Initializes and returns a LangChain LLM client configured for OpenRouter.
+
+    Calls go to `model_name` first and are hedged or failed over to FALLBACK_LLM_MODELS.
+    """
     if not OPENROUTER_API_KEY:
         raise ValueError("OPENROUTER_API_KEY not set. Cannot initialize LLM.")
 
-    return ChatOpenAI(
-        model_name=model_name,
-        temperature=temperature,
-        openai_api_base=OPENROUTER_API_BASE,
-        openai_api_key=OPENROUTER_API_KEY,
-    )
+    model_names = [model_name] + [name for name in FALLBACK_LLM_MODELS if name != model_name]
+    clients = [
+        ChatOpenAI(
+            model_name=name,
+            temperature=temperature,
+            openai_api_base=OPENROUTER_API_BASE,
+            openai_api_key=OPENROUTER_API_KEY,
+            request_timeout=LLM_REQUEST_TIMEOUT,
+            # HedgedChatModel is the retry policy: a failed call falls over to the next model at once.
+            max_retries=0,
+            cache=False,
+        )
+        for name in model_names
+    ]
+    # Agents stream their tool-calling steps; answering those through _generate lets the response cache see them.
+    return HedgedChatModel(clients=clients, cache=get_llm_cache(agent_name) or False, disable_streaming="tool_calling")
     
 def get_embedding_model():
     """Initializes and returns a LangChain embedding Ollama client."""
@@ -21,4 +56,4 @@ def get_embedding_model():
     
     return OllamaEmbeddings(
         model=EMBEDDING_MODEL
-    )
\ No newline at end of file
+    )
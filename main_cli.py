@@ -1,6 +1,8 @@
 import argparse
 import os
+from pathlib import Path
 from agents.coordinator import route_query
+from core.config import DEFAULT_SNAPSHOT_PATH
 from dotenv import load_dotenv
 
 def main():
@@ -18,6 +20,14 @@ def main():
     ask_parser = study_subparsers.add_parser("ask", help="Ask a question to your indexed knowledge base")
     ask_parser.add_argument("query", type=str, help="The question you want to ask")
 
+    # studybuddy snapshot export/import
+    snapshot_parser = study_subparsers.add_parser("snapshot", help="Export your knowledge base to a single file or import one built elsewhere")
+    snapshot_subparsers = snapshot_parser.add_subparsers(dest="snapshot_command", help="Snapshot commands", required=True)
+    export_parser = snapshot_subparsers.add_parser("export", help="Write the indexed knowledge base to a snapshot file")
+    export_parser.add_argument("--output", type=str, default=str(DEFAULT_SNAPSHOT_PATH), help=f"Path of the snapshot file to write. Defaults to '{DEFAULT_SNAPSHOT_PATH}'.")
+    import_parser = snapshot_subparsers.add_parser("import", help="Replace the knowledge base with the contents of a snapshot file")
+    import_parser.add_argument("path", type=str, help="Path of the snapshot file to load")
+
     code_parser = subparsers.add_parser("codehelper", help="Ask, programming questions, get code written or debbuged")
     code_parser.add_argument("query", type=str, help="What you want CodeHelper to do (e.g. write code, debug, explain)")
 
@@ -38,6 +48,14 @@ def main():
         elif args.study_command == "ask":
             print(f"Asking StudyBuddy: {args.query}\n")
             response = route_query(query=args.query, agent_name="studybuddy")
+        elif args.study_command == "snapshot":
+            from rag_components.rag_manager import RAGManager
+            if args.snapshot_command == "export":
+                print(f"Exporting the knowledge base to '{args.output}'...\n")
+                response = RAGManager().export_snapshot(Path(args.output))
+            else:
+                print(f"Importing the knowledge base from '{args.path}'...\n")
+                response = RAGManager().import_snapshot(Path(args.path))
         else:
             response = "Unknown studybuddy command."
     elif args.command_group == "codehelper":
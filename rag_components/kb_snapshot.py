@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from langchain_chroma import Chroma
+
+SNAPSHOT_FORMAT = "cs-student-copilot-kb-snapshot"
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+RECORDS_FILE = "records.json"
+EMBEDDINGS_FILE = "embeddings.f32"
+
+# Stays below Chroma's maximum number of records per add() call.
+IMPORT_BATCH_SIZE = 5000
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def export_snapshot(vector_store: Chroma, output_path: Path, embedding_model: str) -> int:
+    """Writes every chunk of the vector store (vectors, texts and metadata) to a single compressed snapshot file.
+
+    Returns the number of exported chunks.
+    """
+    contents = vector_store.get(include=["embeddings", "documents", "metadatas"])
+    embeddings = np.asarray(contents["embeddings"], dtype="<f4")
+    if embeddings.ndim != 2:
+        raise ValueError("The knowledge base is empty, there is nothing to export.")
+
+    records = json.dumps({
+        "ids": contents["ids"],
+        "documents": contents["documents"],
+        "metadatas": contents["metadatas"],
+    }).encode("utf-8")
+    vectors = embeddings.tobytes()
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": embedding_model,
+        "chunk_count": embeddings.shape[0],
+        "dimension": embeddings.shape[1],
+        "collection_metadata": vector_store._collection.metadata,
+        "checksums": {RECORDS_FILE: _sha256(records), EMBEDDINGS_FILE: _sha256(vectors)},
+    }
+
+    # Written next to the destination first, so a reader never sees a partial snapshot.
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(MANIFEST_FILE, json.dumps(manifest, indent=2))
+        archive.writestr(RECORDS_FILE, records)
+        archive.writestr(EMBEDDINGS_FILE, vectors)
+    os.replace(tmp_path, output_path)
+    return embeddings.shape[0]
+
+def read_snapshot(snapshot_path: Path, embedding_model: str) -> tuple[dict, dict, np.ndarray]:
+    """Reads and validates a snapshot file, returning its manifest, records and embeddings."""
+    try:
+        with zipfile.ZipFile(snapshot_path) as archive:
+            manifest = json.loads(archive.read(MANIFEST_FILE))
+            if manifest.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"'{snapshot_path}' is not a knowledge base snapshot.")
+            if manifest.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {manifest.get('version')} (expected {SNAPSHOT_VERSION}).")
+            if manifest["embedding_model"] != embedding_model:
+                raise ValueError(
+                    f"Snapshot was built with embedding model '{manifest['embedding_model']}', "
+                    f"but this node uses '{embedding_model}'. Queries would not match its vectors."
+                )
+            records = archive.read(RECORDS_FILE)
+            vectors = archive.read(EMBEDDINGS_FILE)
+        for name, data in ((RECORDS_FILE, records), (EMBEDDINGS_FILE, vectors)):
+            if _sha256(data) != manifest["checksums"][name]:
+                raise ValueError(f"Checksum mismatch for '{name}', the snapshot is corrupted.")
+        embeddings = np.frombuffer(vectors, dtype="<f4").reshape(manifest["chunk_count"], manifest["dimension"])
+        records = json.loads(records)
+        if not len(records["ids"]) == len(records["documents"]) == len(records["metadatas"]) == len(embeddings):
+            raise ValueError(f"'{snapshot_path}' holds a different number of records and vectors.")
+    except (zipfile.BadZipFile, KeyError, TypeError, AttributeError) as e:
+        # A malformed manifest or records file surfaces as a missing key or a value of the wrong type.
+        raise ValueError(f"'{snapshot_path}' is not a valid knowledge base snapshot: {e}")
+
+    return manifest, records, embeddings
+
+def _new_generation(persist_directory: Path) -> Path:
+    return persist_directory.with_name(f"{persist_directory.name}.v{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}")
+
+def _swap_in(persist_directory: Path, generation: Path) -> Optional[Path]:
+    """Atomically points the `persist_directory` symlink at `generation`, returning the directory it replaced."""
+    link = persist_directory.with_name(persist_directory.name + ".link")
+    link.unlink(missing_ok=True)
+    os.symlink(generation.name, link, target_is_directory=True)
+
+    previous = None
+    if persist_directory.is_symlink():
+        previous = persist_directory.resolve()
+    elif persist_directory.exists():
+        # An index built in place: move it aside once so the symlink can take its place.
+        previous = _new_generation(persist_directory)
+        persist_directory.rename(previous)
+    try:
+        os.replace(link, persist_directory)
+    except OSError:
+        if previous is not None and not persist_directory.is_symlink():
+            previous.rename(persist_directory)
+        link.unlink(missing_ok=True)
+        raise
+    return previous
+
+def import_snapshot(snapshot_path: Path, persist_directory: Path, embedding_function, embedding_model: str) -> int:
+    """Loads a snapshot into `persist_directory`, replacing the current vector store.
+
+    The snapshot is written to a new versioned directory and `persist_directory` is then switched
+    to it with a single symlink replace, so readers see either the old index or the complete new
+    one. The replaced version is kept until the next import for clients still reading from it.
+    Returns the number of imported chunks.
+    """
+    manifest, records, embeddings = read_snapshot(snapshot_path, embedding_model)
+
+    generation = _new_generation(persist_directory)
+    try:
+        # A path Chroma has never seen gets its own client rather than a cached one of an older version.
+        store = Chroma(
+            persist_directory=str(generation.resolve()),
+            embedding_function=embedding_function,
+            collection_metadata=manifest["collection_metadata"],
+        )
+        for start in range(0, len(records["ids"]), IMPORT_BATCH_SIZE):
+            end = start + IMPORT_BATCH_SIZE
+            store._collection.add(
+                ids=records["ids"][start:end],
+                embeddings=embeddings[start:end],
+                documents=records["documents"][start:end],
+                metadatas=records["metadatas"][start:end],
+            )
+        previous = _swap_in(persist_directory, generation)
+    except BaseException:
+        shutil.rmtree(generation, ignore_errors=True)
+        raise
+
+    keep = {generation.name, previous.name if previous else None}
+    for old in persist_directory.parent.glob(f"{persist_directory.name}.v*"):
+        if old.name not in keep:
+            shutil.rmtree(old, ignore_errors=True)
+    return manifest["chunk_count"]
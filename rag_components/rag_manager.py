@@ -2,14 +2,16 @@ import shutil
 from pathlib import Path
 from typing import Optional
 
-from langchain.chains import RetrievalQA
+from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.prompts import PromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader, TextLoader
 from langchain_chroma import Chroma
+from langchain_core.runnables import Runnable
 
-from core.config import CHROMA_PERSIST_DIR, DEFAULT_LLM_MODEL, RAG_LLM_MODEL
+from core.config import CHROMA_PERSIST_DIR, DEFAULT_LLM_MODEL, EMBEDDING_MODEL, RAG_LLM_MODEL
 from core.llm_service import get_embedding_model, get_llm
+from rag_components.kb_snapshot import export_snapshot, import_snapshot
 
 QA_TEMPLATE_STR = """
 Use the following pieces of context to answer the question at the end.
@@ -30,7 +32,7 @@ class RAGManager:
     def __init__(self, persist_directory: Path = CHROMA_PERSIST_DIR):
         self.persist_directory = persist_directory
         self.embedding_function = get_embedding_model()
-        self.llm = get_llm(model_name=RAG_LLM_MODEL if RAG_LLM_MODEL else DEFAULT_LLM_MODEL)
+        self.llm = get_llm(model_name=RAG_LLM_MODEL if RAG_LLM_MODEL else DEFAULT_LLM_MODEL, agent_name="studybuddy")
         self.vector_store: Optional[Chroma] = self._load_vector_store()
 
     def _load_documents(self, data_path: Path, file_type: str) -> list:
@@ -46,7 +48,8 @@ class RAGManager:
     def _load_vector_store(self) -> Optional[Chroma]:
         if self.persist_directory.exists():
             print(f"Loading existing vector store from: {self.persist_directory}")
-            return Chroma(persist_directory=str(self.persist_directory), embedding_function=self.embedding_function)
+            # Resolved, so a swapped-in snapshot is opened as a new Chroma client instead of a cached one.
+            return Chroma(persist_directory=str(self.persist_directory.resolve()), embedding_function=self.embedding_function)
         return None
 
     def build_or_update_index(self, source_directory: Path, force_recreate: bool = False) -> str:
@@ -56,7 +59,12 @@ class RAGManager:
         if self.persist_directory.exists() and force_recreate:
             print(f"Force recreating index. Deleting old index at {self.persist_directory}")
             self.vector_store = None
-            shutil.rmtree(self.persist_directory)
+            if self.persist_directory.is_symlink():
+                # An imported snapshot: delete the version it points to along with the link.
+                shutil.rmtree(self.persist_directory.resolve())
+                self.persist_directory.unlink()
+            else:
+                shutil.rmtree(self.persist_directory)
         
         print("Loading documents...")
         txt_docs = self._load_documents(source_directory, "txt")
@@ -76,7 +84,7 @@ class RAGManager:
             self.vector_store = Chroma.from_documents(
                 documents=chunks, 
                 embedding=self.embedding_function, 
-                persist_directory=str(self.persist_directory)
+                persist_directory=str(self.persist_directory.resolve())
             )
             return f"{feedback}\nSuccessfully created new index with {len(chunks)} chunks from {len(documents)} documents."
         else:
@@ -84,39 +92,60 @@ class RAGManager:
             self.vector_store.add_documents(chunks)
             return f"{feedback}\nSuccessfully added {len(chunks)} new chunks from {len(documents)} documents to the index."
 
-    def query(self, query_str: str) -> str:
+    def export_snapshot(self, output_path: Path) -> str:
         if not self.vector_store: 
             self.vector_store = self._load_vector_store()
-            
+
         if not self.vector_store: 
             return "Knowledge base not initialized. Please index a directory first."
 
-        qa_chain = self._get_qa_chain()
-        
-        if not qa_chain: 
-            return "Failed to create QA chain."
+        try:
+            chunk_count = export_snapshot(self.vector_store, output_path, EMBEDDING_MODEL)
+        except ValueError as e:
+            return f"Error: {e}"
+        return f"Successfully exported {chunk_count} chunks to snapshot '{output_path}'."
 
-        result = qa_chain.invoke({"query": query_str})
-        answer = result.get('result', 'Could not find an answer.')
-        sources = list(set([doc.metadata.get('source', 'N/A') for doc in result.get('source_documents', [])]))
-        if sources: answer += f"\n\nSources Used: {', '.join(sources)}"
-        return answer
+    def import_snapshot(self, snapshot_path: Path) -> str:
+        if not snapshot_path.is_file():
+            return f"Error: Snapshot file '{snapshot_path}' not found."
+
+        try:
+            chunk_count = import_snapshot(snapshot_path, self.persist_directory, self.embedding_function, EMBEDDING_MODEL)
+        except ValueError as e:
+            return f"Error: {e}"
+        self.vector_store = self._load_vector_store()
+        return f"Successfully imported {chunk_count} chunks from snapshot '{snapshot_path}'."
 
-    def _get_qa_chain(self) -> Optional[RetrievalQA]:
+    def retrieve(self, query_str: str) -> Optional[list]:
+        """Embeds the query and returns the most relevant chunks, or None if there is no knowledge base yet."""
+        if not self.vector_store: 
+            self.vector_store = self._load_vector_store()
+            
         if not self.vector_store: 
             return None
-        
-        retriever = self.vector_store.as_retriever(
+
+        return self._get_retriever().invoke(query_str)
+
+    def query(self, query_str: str, documents: Optional[list] = None) -> str:
+        """Answers the query from the knowledge base, using `documents` instead of retrieving them if given."""
+        if documents is None:
+            documents = self.retrieve(query_str)
+
+        if documents is None: 
+            return "Knowledge base not initialized. Please index a directory first."
+
+        answer = self._get_qa_chain().invoke({"context": documents, "question": query_str}) or 'Could not find an answer.'
+        sources = list(set([doc.metadata.get('source', 'N/A') for doc in documents]))
+        if sources: answer += f"\n\nSources Used: {', '.join(sources)}"
+        return answer
+
+    def _get_retriever(self):
+        return self.vector_store.as_retriever(
             search_type="mmr", 
             search_kwargs={"k": 5, "fetch_k": 20}
         )
-        
+
+    def _get_qa_chain(self) -> Runnable:
+        """Returns a chain that stuffs the given chunks into the QA prompt and answers from them."""
         prompt = PromptTemplate(template=QA_TEMPLATE_STR, input_variables=["context", "question"])
-        
-        return RetrievalQA.from_chain_type(
-            llm=self.llm, 
-            chain_type="stuff", 
-            retriever=retriever, 
-            chain_type_kwargs={"prompt": prompt}, 
-            return_source_documents=True
-        )
\ No newline at end of file
+        return create_stuff_documents_chain(self.llm, prompt)
\ No newline at end of file
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from agents.coordinator import AGENT_NAMES, route_query, stream_query, warm_up_agents
+from agents.study_buddy_rag import get_speculation_stats
+from core.config import (
+    SERVER_AGENT_WORKERS, SERVER_ALLOW_HOST_TOOLS, SERVER_API_TOKEN, SERVER_HOST, SERVER_PORT, SERVER_QUEUE_SIZE,
+)
+from core.hedged_llm import get_model_health_stats
+from core.llm_service import get_llm_cache_stats
+
+class AgentQueue:
+    """Bounded queue in front of one agent: `workers` queries run at once and up to `max_waiting` more wait for a slot."""
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(workers)
+
+    async def acquire(self):
+        if self.running + self.waiting >= self.workers + self.max_waiting:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Agent is saturated, please retry later.", headers={"Retry-After": "5"})
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+        self.completed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_waiting": self.max_waiting,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+async def stream_events(query: str, agent_name: str):
+    """Streams an agent's events as NDJSON lines."""
+    events = stream_query(query, agent_name, SERVER_ALLOW_HOST_TOOLS)
+    try:
+        while True:
+            # Each step runs in a worker thread; a disconnecting client is only noticed once the step returns.
+            event = await run_in_threadpool(next, events, None)
+            if event is None:
+                break
+            yield json.dumps(event) + "\n"
+    finally:
+        events.close()
+
+class QueuedStreamingResponse(StreamingResponse):
+    """StreamingResponse that holds an agent queue slot until the agent run has ended.
+
+    The slot is released here rather than in the body generator, because the generator never starts
+    when the client is gone before the response headers could be sent.
+    """
+    def __init__(self, queue: AgentQueue, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self.queue = queue
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Ends a generator stopped mid-stream; one that never started or already finished is unaffected.
+            await self.body_iterator.aclose()
+            self.queue.release()
+
+def parse_agent_workers(value: str) -> dict[str, int]:
+    """Parses SERVER_AGENT_WORKERS, e.g. 'studybuddy=2,codehelper=2', into the number of workers per agent."""
+    workers = {}
+    for entry in filter(None, (entry.strip() for entry in value.split(","))):
+        name, _, count = (part.strip() for part in entry.partition("="))
+        if name not in AGENT_NAMES or not count.isdigit() or int(count) < 1:
+            raise ValueError(
+                f"Invalid SERVER_AGENT_WORKERS entry '{entry}'. Expected '<agent>=<workers>' with a positive "
+                f"number of workers and an agent out of: {', '.join(AGENT_NAMES)}."
+            )
+        workers[name] = int(count)
+    return workers
+
+try:
+    agent_workers = parse_agent_workers(SERVER_AGENT_WORKERS)
+except ValueError as e:
+    raise SystemExit(f"Error: {e}")
+
+agent_queues = {name: AgentQueue(agent_workers.get(name, 1), SERVER_QUEUE_SIZE) for name in AGENT_NAMES}
+
+def require_token(authorization: Optional[str] = Header(None)):
+    """Rejects requests without the configured bearer token. Without a token the server only listens on loopback."""
+    if SERVER_API_TOKEN is None:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), SERVER_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid bearer token.", headers={"WWW-Authenticate": "Bearer"})
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class QueryRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="The request for the agent.")
+    stream: bool = Field(False, description="Stream the agent's progress as newline-delimited JSON events.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("Warming up agents...")
+    await run_in_threadpool(warm_up_agents, SERVER_ALLOW_HOST_TOOLS)
+    yield
+
+app = FastAPI(title="CS Student Copilot", lifespan=lifespan)
+
+@app.post("/agents/{agent_name}/query", dependencies=[Depends(require_token)])
+async def query_agent(agent_name: str, request: QueryRequest):
+    queue = agent_queues.get(agent_name)
+    if queue is None:
+        raise HTTPException(status_code=404, detail=f"Unknown agent '{agent_name}'. Available agents: {', '.join(AGENT_NAMES)}.")
+
+    await queue.acquire()
+    if request.stream:
+        return QueuedStreamingResponse(queue, stream_events(request.query, agent_name), media_type="application/x-ndjson")
+    try:
+        response = await run_in_threadpool(route_query, request.query, agent_name, SERVER_ALLOW_HOST_TOOLS)
+    finally:
+        queue.release()
+    return {"agent": agent_name, "response": response}
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/metrics", dependencies=[Depends(require_token)])
+async def metrics():
+    return {
+        "queues": {name: queue.stats() for name, queue in agent_queues.items()},
+        "models": get_model_health_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "speculative_retrieval": get_speculation_stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="CS Student Copilot HTTP server")
+    parser.add_argument("--host", type=str, default=SERVER_HOST, help=f"Interface to bind to. Defaults to '{SERVER_HOST}'.")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"Port to listen on. Defaults to {SERVER_PORT}.")
+    args = parser.parse_args()
+    if SERVER_API_TOKEN is None and not is_loopback(args.host):
+        print(f"Error: refusing to listen on '{args.host}' without SERVER_API_TOKEN.")
+        print("Set SERVER_API_TOKEN so that only clients sending it can query the agents.")
+        return
+    if SERVER_ALLOW_HOST_TOOLS:
+        print("Warning: SERVER_ALLOW_HOST_TOOLS is set, clients can run code and read files on this machine.")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    load_dotenv()
+    if not os.getenv("OPENROUTER_API_KEY"):
+        print("Error: OPENROUTER_API_KEY is not set in your environment or .env file.")
+        print("Please set it up before running the server.")
+    else:
+        main()
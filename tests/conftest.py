@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core import hedged_llm
+
+class StubOpenAIServer:
+    """Minimal OpenAI-compatible chat completions server whose models answer after a set delay or fail.
+
+    `behaviour` maps a model name to {"delay": seconds before the first byte, "status": HTTP error status}.
+    Every request is logged as (model, seconds since the server started).
+    """
+    def __init__(self):
+        self.behaviour: dict[str, dict] = {}
+        self.requests: list[tuple[str, float]] = []
+        self.started_at = time.monotonic()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def requested(self, model: str) -> int:
+        return sum(1 for name, _ in self.requests if name == model)
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                model = body["model"]
+                stub.requests.append((model, time.monotonic() - stub.started_at))
+                behaviour = stub.behaviour.get(model, {})
+                time.sleep(behaviour.get("delay", 0))
+                try:
+                    if "status" in behaviour:
+                        self._send(behaviour["status"], {"error": {"message": f"{model} is down"}})
+                    elif body.get("stream"):
+                        self._stream(model)
+                    else:
+                        self._send(200, {
+                            "id": "stub", "object": "chat.completion", "created": 0, "model": model,
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": f"answer from {model}"}, "finish_reason": "stop"}],
+                            "usage": {"prompt_tokens": 1, "completion_tokens": 3, "total_tokens": 4},
+                        })
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up on this model
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for delta, finish_reason in [({"content": "answer "}, None), ({"content": f"from {model}"}, None), ({}, "stop")]:
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+@pytest.fixture
+def stub_server():
+    server = StubOpenAIServer()
+    yield server
+    server.shutdown()
+
+@pytest.fixture(autouse=True)
+def fresh_model_health(monkeypatch):
+    """Gives every test empty latency windows and closed circuits, with delays short enough to test."""
+    monkeypatch.setattr(hedged_llm, "_model_health", {})
+    monkeypatch.setattr(hedged_llm, "LLM_HEDGE_DEFAULT_DELAY", 0.3)
+    monkeypatch.setattr(hedged_llm, "LLM_HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(hedged_llm, "LLM_CIRCUIT_RESET_SECONDS", 0.5)
@@ -0,0 +1,148 @@
+import time
+
+import pytest
+from langchain_openai import ChatOpenAI
+
+from core.hedged_llm import MIN_LATENCY_SAMPLES, HedgedChatModel, get_model_health
+
+def make_model(stub_server, *model_names: str, request_timeout: float = 5.0) -> HedgedChatModel:
+    clients = [
+        ChatOpenAI(
+            model_name=name,
+            openai_api_base=stub_server.base_url,
+            openai_api_key="test",
+            request_timeout=request_timeout,
+            max_retries=0,
+            cache=False,
+        )
+        for name in model_names
+    ]
+    return HedgedChatModel(clients=clients, request_timeout=request_timeout, cache=False)
+
+def prime_latency(model_name: str, seconds: float, first_chunk: bool = False):
+    health = get_model_health(model_name)
+    for _ in range(MIN_LATENCY_SAMPLES):
+        if first_chunk:
+            health.record_first_chunk(seconds)
+        else:
+            health.record_success(seconds)
+
+def streamed_text(llm: HedgedChatModel) -> str:
+    return "".join(chunk.content for chunk in llm.stream("hi"))
+
+def test_hedges_after_latency_percentile(stub_server):
+    stub_server.behaviour["primary"] = {"delay": 2.0}
+    prime_latency("primary", 0.2)
+    llm = make_model(stub_server, "primary", "fallback")
+
+    start = time.monotonic()
+    assert llm.invoke("hi").content == "answer from fallback"
+    assert time.monotonic() - start < 1.0
+
+    (_, primary_at), (_, fallback_at) = stub_server.requests
+    assert 0.15 <= fallback_at - primary_at < 0.6
+
+def test_does_not_hedge_a_fast_model(stub_server):
+    stub_server.behaviour["primary"] = {"delay": 0.1}
+    llm = make_model(stub_server, "primary", "fallback")
+
+    assert llm.invoke("hi").content == "answer from primary"
+    assert stub_server.requested("fallback") == 0
+
+def test_first_response_wins(stub_server):
+    # The primary is hedged after the default delay but still answers before the fallback.
+    stub_server.behaviour["primary"] = {"delay": 0.6}
+    stub_server.behaviour["fallback"] = {"delay": 2.0}
+    llm = make_model(stub_server, "primary", "fallback")
+
+    start = time.monotonic()
+    assert llm.invoke("hi").content == "answer from primary"
+    assert time.monotonic() - start < 1.5
+    assert stub_server.requested("fallback") == 1
+
+def test_fails_over_on_error_without_waiting_for_the_hedge_delay(stub_server):
+    stub_server.behaviour["primary"] = {"status": 500}
+    llm = make_model(stub_server, "primary", "fallback")
+
+    start = time.monotonic()
+    assert llm.invoke("hi").content == "answer from fallback"
+    assert time.monotonic() - start < 0.3
+    assert stub_server.requested("primary") == 1
+    assert get_model_health("primary").failures == 1
+
+def test_raises_when_every_model_fails(stub_server):
+    stub_server.behaviour["primary"] = {"status": 500}
+    stub_server.behaviour["fallback"] = {"status": 503}
+    llm = make_model(stub_server, "primary", "fallback")
+
+    with pytest.raises(RuntimeError, match="All models failed"):
+        llm.invoke("hi")
+
+def test_circuit_opens_and_lets_a_single_trial_through(stub_server):
+    stub_server.behaviour["primary"] = {"status": 500}
+    llm = make_model(stub_server, "primary", "fallback")
+
+    for _ in range(3):
+        llm.invoke("hi")
+    assert get_model_health("primary").stats()["circuit_open"]
+
+    # While open, calls skip the primary entirely.
+    assert llm.invoke("hi").content == "answer from fallback"
+    assert stub_server.requested("primary") == 3
+
+    # After the reset period exactly one trial call reaches it; failing reopens the circuit.
+    time.sleep(0.6)
+    llm.invoke("hi")
+    llm.invoke("hi")
+    assert stub_server.requested("primary") == 4
+
+def test_half_open_circuit_closes_after_a_successful_trial(stub_server):
+    health = get_model_health("primary")
+    for _ in range(3):
+        health.record_failure()
+    time.sleep(0.6)
+    assert health.allow_request()
+    assert not health.allow_request()
+
+    llm = make_model(stub_server, "primary", "fallback")
+    time.sleep(0.6)
+    assert llm.invoke("hi").content == "answer from primary"
+    assert not health.stats()["circuit_open"]
+
+def test_generate_is_bounded_by_request_timeout(stub_server):
+    stub_server.behaviour["primary"] = {"delay": 3.0}
+    stub_server.behaviour["fallback"] = {"delay": 3.0}
+    llm = make_model(stub_server, "primary", "fallback", request_timeout=0.5)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        llm.invoke("hi")
+    assert time.monotonic() - start < 1.0
+
+def test_stream_hedges_on_first_chunk_latency(stub_server):
+    # A full completion takes seconds, but the first chunk normally arrives within 0.1s.
+    stub_server.behaviour["primary"] = {"delay": 2.0}
+    prime_latency("primary", 5.0)
+    prime_latency("primary", 0.1, first_chunk=True)
+    llm = make_model(stub_server, "primary", "fallback")
+
+    start = time.monotonic()
+    assert streamed_text(llm) == "answer from fallback"
+    assert time.monotonic() - start < 1.0
+
+def test_stream_fails_over_on_error(stub_server):
+    stub_server.behaviour["primary"] = {"status": 500}
+    llm = make_model(stub_server, "primary", "fallback")
+
+    assert streamed_text(llm) == "answer from fallback"
+    assert stub_server.requested("primary") == 1
+
+def test_stream_is_bounded_by_request_timeout(stub_server):
+    stub_server.behaviour["primary"] = {"delay": 3.0}
+    stub_server.behaviour["fallback"] = {"delay": 3.0}
+    llm = make_model(stub_server, "primary", "fallback", request_timeout=0.5)
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        streamed_text(llm)
+    assert time.monotonic() - start < 1.0